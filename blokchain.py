@@ -7,17 +7,24 @@ from uuid import uuid4
 from flask import Flask, request, jsonify, render_template_string
 import requests
 from urllib.parse import urlparse
-from utils_crypto import verify_signature, generate_keypair
+from utils_crypto import verify_signature
 from utils_merkle import calculate_merkle_root
+from utils_keypool import KeypairPool
 
-CHAIN_FILE = "chain_data.json"
+DATA_DIR = os.environ.get("DATA_DIR", ".")  # Direktori data per node
+CHAIN_FILE = os.path.join(DATA_DIR, "chain_data.json")
+MAX_FUTURE_BLOCK_TIME = 120  # Toleransi (detik) timestamp block di masa depan
+KEYPOOL_SIZE = int(os.environ.get("KEYPOOL_SIZE", 8))  # Jumlah keypair siap pakai
+KEYPOOL_KEY_SIZE = int(os.environ.get("KEYPOOL_KEY_SIZE", 1024))
+KEYPOOL_WORKERS = int(os.environ["KEYPOOL_WORKERS"]) if os.environ.get("KEYPOOL_WORKERS") else None
 
 class Blockchain:
     def __init__(self):
         self.nodes = set()
         self.chain = []
         self.current_transactions = []
-        self.difficulty_target = "0000"
+        self.initial_difficulty = "0000"  # Difficulty genesis, titik awal replay difficulty
+        self.difficulty_target = self.initial_difficulty
         self.difficulty_adjustment_interval = 5  # Adjust setiap 5 blocks
         self.target_block_time = 10  # Target 10 detik per block
         self.user_nonces = {}  # Track nonce per user untuk prevent replay attacks
@@ -32,12 +39,19 @@ class Blockchain:
             self.save_chain()
 
     def save_chain(self):
+        os.makedirs(DATA_DIR, exist_ok=True)
         with open(CHAIN_FILE, "w") as f:
             json.dump(self.chain, f, indent=4)
 
     def load_chain(self):
         with open(CHAIN_FILE, "r") as f:
             self.chain = json.load(f)
+        difficulty_target = self.replay_difficulty(self.chain)
+        if difficulty_target is None:
+            # Chain lama yang difficulty-nya tidak konsisten: lanjut dari block terakhir
+            print(f"[!] Difficulty di {CHAIN_FILE} tidak konsisten dengan aturan adjustment")
+            difficulty_target = self.chain[-1].get('difficulty', self.initial_difficulty)
+        self.difficulty_target = difficulty_target
 
     def add_node(self, address):
         if not address.startswith("http://") and not address.startswith("https://"):
@@ -50,17 +64,24 @@ class Blockchain:
         if not chain or not isinstance(chain, list):
             return False
         try:
+            # Difficulty tiap block dihitung ulang dari genesis, bukan dipercaya dari peer
+            if self.replay_difficulty(chain) is None:
+                return False
             last_block = chain[0]
             current_index = 1
             while current_index < len(chain):
                 block = chain[current_index]
                 if block['hash_of_previous_block'] != self.hash_block(last_block):
                     return False
+                if block['timestamp'] < last_block['timestamp'] or block['timestamp'] > time() + MAX_FUTURE_BLOCK_TIME:
+                    return False
+                difficulty = block['difficulty']
                 if not self.valid_proof(
                     current_index,
                     block['hash_of_previous_block'],
                     block['transactions'],
-                    block['nonce']
+                    block['nonce'],
+                    difficulty
                 ):
                     return False
                 last_block = block
@@ -89,6 +110,7 @@ class Blockchain:
 
         if new_chain:
             self.chain = new_chain
+            self.difficulty_target = self.replay_difficulty(new_chain)
             self.save_chain()
             return True
         return False
@@ -103,31 +125,54 @@ class Blockchain:
             nonce += 1
         return nonce
 
-    def valid_proof(self, index, hash_of_previous_block, transactions, nonce):
+    def valid_proof(self, index, hash_of_previous_block, transactions, nonce, difficulty_target=None):
+        difficulty_target = difficulty_target or self.difficulty_target
         content = f'{index}{hash_of_previous_block}{transactions}{nonce}'.encode()
         content_hash = hashlib.sha256(content).hexdigest()
-        return content_hash[:len(self.difficulty_target)] == self.difficulty_target
+        return content_hash[:len(difficulty_target)] == difficulty_target
 
-    def adjust_difficulty(self):
-        """Adjust difficulty berdasarkan kecepatan mining."""
-        if len(self.chain) % self.difficulty_adjustment_interval != 0:
-            return
+    def next_difficulty(self, chain, difficulty_target, length=None):
+        """Difficulty untuk block setelah chain[:length], dari difficulty_target saat ini."""
+        length = len(chain) if length is None else length
+        if length % self.difficulty_adjustment_interval != 0:
+            return difficulty_target
         
-        if len(self.chain) < self.difficulty_adjustment_interval:
-            return
+        if length < self.difficulty_adjustment_interval:
+            return difficulty_target
         
         # Hitung waktu yang diperlukan untuk N blocks terakhir
-        recent_blocks = self.chain[-self.difficulty_adjustment_interval:]
+        recent_blocks = chain[length - self.difficulty_adjustment_interval:length]
         time_taken = recent_blocks[-1]['timestamp'] - recent_blocks[0]['timestamp']
         expected_time = self.target_block_time * self.difficulty_adjustment_interval
         
         # Jika terlalu cepat, tambah difficulty
         if time_taken < expected_time * 0.5:
-            self.difficulty_target += "0"  # Lebih sulit
-            print(f"[+] Difficulty INCREASED to {self.difficulty_target}")
+            return difficulty_target + "0"  # Lebih sulit
         # Jika terlalu lambat, kurangi difficulty
-        elif time_taken > expected_time * 2 and len(self.difficulty_target) > 1:
-            self.difficulty_target = self.difficulty_target[:-1]  # Lebih mudah
+        if time_taken > expected_time * 2 and len(difficulty_target) > 1:
+            return difficulty_target[:-1]  # Lebih mudah
+        return difficulty_target
+
+    def replay_difficulty(self, chain):
+        """
+        Hitung ulang difficulty dari genesis dengan aturan adjust_difficulty.
+        Return difficulty untuk block berikutnya, atau None jika ada block
+        yang difficulty-nya tidak sama dengan hasil hitungan.
+        """
+        difficulty_target = self.initial_difficulty
+        for i, block in enumerate(chain):
+            if block.get('difficulty') != difficulty_target:
+                return None
+            difficulty_target = self.next_difficulty(chain, difficulty_target, i + 1)
+        return difficulty_target
+
+    def adjust_difficulty(self):
+        """Adjust difficulty berdasarkan kecepatan mining."""
+        old_target = self.difficulty_target
+        self.difficulty_target = self.next_difficulty(self.chain, old_target)
+        if len(self.difficulty_target) > len(old_target):
+            print(f"[+] Difficulty INCREASED to {self.difficulty_target}")
+        elif len(self.difficulty_target) < len(old_target):
             print(f"[-] Difficulty DECREASED to {self.difficulty_target}")
 
     def append_block(self, nonce, hash_of_previous_block):
@@ -158,6 +203,14 @@ class Blockchain:
                     balance -= tx['amount']
         return balance
 
+    def get_pending_spend_of(self, address):
+        """Total amount + fee dari transaksi address yang masih di mempool."""
+        return sum(
+            tx['amount'] + tx.get('fee', 0)
+            for tx in self.current_transactions
+            if tx['sender'] == address
+        )
+
     def add_transaction(self, sender, recipient, amount, signature=None, fee=0, nonce=None):
         if sender != "0":
             # Verify nonce (prevent replay attacks)
@@ -165,7 +218,6 @@ class Blockchain:
                 current_nonce = self.user_nonces.get(sender, -1)
                 if nonce <= current_nonce:
                     raise ValueError(f"Nonce invalid. Expected > {current_nonce}, got {nonce}")
-                self.user_nonces[sender] = nonce
             
             message = f"{sender}:{recipient}:{amount}:{fee}:{nonce}"
             # Sender diasumsikan sebagai Public Key (PEM format) atau identifier unik
@@ -173,9 +225,15 @@ class Blockchain:
             if not signature or not verify_signature(sender, message, signature):
                 raise ValueError("Signature tidak valid atau hilang")
 
+            # Saldo dikurangi transaksi sender yang masih pending supaya tidak bisa overspend
             total_cost = amount + fee
-            if self.get_balance_of(sender) < total_cost:
-                raise ValueError(f"Saldo {sender} tidak cukup. Perlu {total_cost}, ada {self.get_balance_of(sender)}")
+            available = self.get_balance_of(sender) - self.get_pending_spend_of(sender)
+            if available < total_cost:
+                raise ValueError(f"Saldo {sender} tidak cukup. Perlu {total_cost}, ada {available}")
+
+            # Nonce baru dipakai setelah semua pengecekan lolos
+            if nonce is not None:
+                self.user_nonces[sender] = nonce
 
         self.current_transactions.append({
             'sender': sender,
@@ -194,8 +252,11 @@ class Blockchain:
 
 # Flask App
 app = Flask(__name__)
+# Jangan sort keys: valid_proof meng-hash repr transaksi, urutan key harus sama antar node
+app.json.sort_keys = False
 node_identifier = str(uuid4()).replace('-', "")
 blockchain = Blockchain()
+keypair_pool = KeypairPool(KEYPOOL_SIZE, KEYPOOL_KEY_SIZE, KEYPOOL_WORKERS)
 
 @app.route('/')
 def home():
@@ -203,13 +264,17 @@ def home():
 
 @app.route('/wallet/new', methods=['GET'])
 def new_wallet():
-    pub, priv = generate_keypair()
+    pub, priv = keypair_pool.get()
     return jsonify({
         'private_key': priv,
         'public_key': pub,
         'message': "Simpan kunci ini! Private key tidak disimpan di server."
     })
 
+@app.route('/wallet/pool', methods=['GET'])
+def wallet_pool_stats():
+    return jsonify(keypair_pool.stats())
+
 @app.route('/transactions/new', methods=['POST'])
 def new_transaction():
     values = request.get_json()
@@ -229,6 +294,58 @@ def new_transaction():
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
 
+def invalid_transaction_fields(tx):
+    """Cek tipe field transaksi; return pesan error atau None jika valid."""
+    if not isinstance(tx, dict):
+        return 'Transaksi harus berupa object'
+    if not all(k in tx for k in ['sender', 'recipient', 'amount', 'signature']):
+        return 'Field kurang'
+    if not all(isinstance(tx[k], str) for k in ['sender', 'recipient', 'signature']):
+        return 'sender, recipient, dan signature harus berupa string'
+    for k in ['amount', 'fee']:
+        value = tx.get(k, 0)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            return f'{k} harus berupa angka >= 0'
+    nonce = tx.get('nonce')
+    if nonce is not None and (isinstance(nonce, bool) or not isinstance(nonce, int)):
+        return 'nonce harus berupa integer'
+    return None
+
+@app.route('/transactions/batch', methods=['POST'])
+def new_transactions_batch():
+    """
+    Terima banyak transaksi sekaligus (diproses berurutan, nonce harus naik).
+    Transaksi yang gagal tidak membatalkan transaksi lain dalam batch.
+    """
+    values = request.get_json(silent=True)
+    transactions = values.get('transactions') if isinstance(values, dict) else None
+    if not isinstance(transactions, list):
+        return jsonify({'error': 'Field transactions harus berupa list'}), 400
+    accepted = 0
+    rejected = []
+    for i, tx in enumerate(transactions):
+        error = invalid_transaction_fields(tx)
+        if error:
+            rejected.append({'index': i, 'error': error})
+            continue
+        try:
+            blockchain.add_transaction(
+                tx['sender'],
+                tx['recipient'],
+                tx['amount'],
+                tx['signature'],
+                fee=tx.get('fee', 0),
+                nonce=tx.get('nonce')
+            )
+            accepted += 1
+        except (ValueError, TypeError) as e:
+            rejected.append({'index': i, 'error': str(e)})
+    return jsonify({
+        'message': f'{accepted} transaksi akan masuk ke block {blockchain.last_block["index"] + 1}',
+        'accepted': accepted,
+        'rejected': rejected
+    }), 201
+
 @app.route('/mine', methods=['GET'])
 def mine_block():
     # Allow custom miner address to receive rewards (facilitates testing)
@@ -380,4 +497,5 @@ def explorer():
 
 if __name__ == '__main__':
     port = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    keypair_pool.start()
     app.run(host='0.0.0.0', port=port)
\ No newline at end of file
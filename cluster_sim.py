@@ -0,0 +1,456 @@
+"""
+Simulator cluster lokal: menjalankan N node blokchain.py di localhost,
+menghubungkan semua node, lalu memberi beban transaksi (signed) dan mining.
+Hasil berupa report JSON: throughput, mempool depth, block propagation
+latency, sync time, dan fork rate.
+
+Contoh:
+    python cluster_sim.py --nodes 3 --duration 60 --tx-rate 5 --report report.json
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from statistics import mean
+from time import sleep, time
+import requests
+import rsa
+from utils_crypto import generate_keypair
+
+BLOCKCHAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blokchain.py")
+MINER_PREFIX = "sim-miner-"  # Penanda coinbase block hasil mine_worker: sim-miner-<node>-<seq>
+
+def hash_block(block):
+    """Hash block, sama dengan Blockchain.hash_block."""
+    return hashlib.sha256(json.dumps(block, sort_keys=True).encode()).hexdigest()
+
+def log(message):
+    """Progress ke stderr supaya stdout tetap berisi report JSON."""
+    print(message, file=sys.stderr, flush=True)
+
+def summarize(values):
+    """Ringkasan statistik (count, mean, p50, p95, max) dalam detik."""
+    if not values:
+        return {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'max': None}
+    ordered = sorted(values)
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 4)
+    return {
+        'count': len(ordered),
+        'mean': round(mean(ordered), 4),
+        'p50': pct(0.50),
+        'p95': pct(0.95),
+        'max': round(ordered[-1], 4)
+    }
+
+class Node:
+    def __init__(self, index, port, data_dir):
+        self.index = index
+        self.port = port
+        self.data_dir = data_dir
+        self.address = f"127.0.0.1:{port}"
+        self.url = f"http://{self.address}"
+        self.process = None
+        self.log_file = None
+        self.session = requests.Session()
+
+    def start(self):
+        os.makedirs(self.data_dir, exist_ok=True)
+        env = dict(os.environ, DATA_DIR=self.data_dir, KEYPOOL_SIZE="0")
+        self.log_file = open(os.path.join(self.data_dir, "output.log"), "w")
+        self.process = subprocess.Popen(
+            [sys.executable, BLOCKCHAIN_SCRIPT, str(self.port)],
+            env=env, stdout=self.log_file, stderr=subprocess.STDOUT
+        )
+
+    def wait_ready(self, timeout):
+        deadline = time() + timeout
+        while time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Node {self.address} berhenti (exit {self.process.returncode}), cek {self.data_dir}/output.log")
+            try:
+                if self.session.get(f"{self.url}/nodes", timeout=1).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            sleep(0.2)
+        raise RuntimeError(f"Node {self.address} tidak siap dalam {timeout} detik")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.log_file:
+            self.log_file.close()
+            self.log_file = None
+        self.session.close()
+
+class Wallet:
+    def __init__(self, key_size):
+        pub_pem, priv_pem = generate_keypair(key_size)
+        self.address = pub_pem
+        self.private_key = rsa.PrivateKey.load_pkcs1(priv_pem.encode())
+        self.nonce = -1
+        self.lock = threading.Lock()
+
+    def next_nonce(self):
+        with self.lock:
+            self.nonce += 1
+            return self.nonce
+
+    def sign(self, recipient, amount, fee, nonce):
+        message = f"{self.address}:{recipient}:{amount}:{fee}:{nonce}"
+        signature = rsa.sign(message.encode(), self.private_key, 'SHA-256')
+        return base64.b64encode(signature).decode()
+
+class ClusterSimulator:
+    def __init__(self, args):
+        self.args = args
+        self.data_root = args.data_root or tempfile.mkdtemp(prefix="dss_cluster_")
+        self.nodes = [
+            Node(i, args.base_port + i, os.path.join(self.data_root, f"node{i}"))
+            for i in range(args.nodes)
+        ]
+        self.wallets = []
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        # RNG terpisah per worker supaya --seed menghasilkan beban yang sama
+        self.tx_rng = random.Random(None if args.seed is None else f"{args.seed}-tx")
+        self.mine_rng = random.Random(None if args.seed is None else f"{args.seed}-mine")
+        self.load_started = None
+        self.load_ended = None
+
+        # Metrics
+        self.tx_submitted = 0
+        self.tx_accepted = 0
+        self.tx_rejected = 0
+        self.tx_errors = {}
+        self.mined = {}              # block hash -> {'index', 'node', 'time'}
+        self.mine_seq = 0
+        self.mine_failures = 0
+        self.mine_timeouts = 0
+        self.first_seen = {}         # (block hash, node index) -> waktu pertama terlihat
+        self.height_hashes = {}      # index -> set block hash yang pernah terlihat
+        self.sync_times = []
+        self.sync_updates = 0
+        self.mempool_samples = {node.index: [] for node in self.nodes}
+
+    # --- Setup -----------------------------------------------------------
+
+    def start_cluster(self):
+        log(f"[+] Menjalankan {len(self.nodes)} node di {self.data_root}")
+        for node in self.nodes:
+            node.start()
+        for node in self.nodes:
+            node.wait_ready(self.args.startup_timeout)
+            log(f"    ✓ Node {node.index} siap di {node.url}")
+
+        for node in self.nodes:
+            peers = [peer.address for peer in self.nodes if peer is not node]
+            if peers:
+                node.session.post(f"{node.url}/nodes/add_nodes", json={'nodes': peers})
+        log("    ✓ Semua node terhubung (full mesh)")
+
+    def fund_wallets(self):
+        log(f"[+] Membuat {self.args.wallets} wallet dan mendanai via mining...")
+        self.wallets = [Wallet(self.args.key_size) for _ in range(self.args.wallets)]
+        funder = self.nodes[0]
+        for wallet in self.wallets:
+            for _ in range(self.args.funding_blocks):
+                res = funder.session.get(f"{funder.url}/mine", params={'miner_address': wallet.address},
+                                         timeout=self.args.request_timeout)
+                if res.status_code != 200:
+                    raise RuntimeError(f"Funding gagal: /mine di node {funder.index} -> {res.status_code}")
+        funded_length = funder.session.get(f"{funder.url}/blockchain", timeout=self.args.request_timeout).json()['length']
+        for node in self.nodes[1:]:
+            res = node.session.get(f"{node.url}/nodes/sync", timeout=self.args.request_timeout)
+            if res.status_code != 200 or len(res.json()['chain']) != funded_length:
+                raise RuntimeError(f"Sync awal gagal: node {node.index} tidak mengambil chain funding dari node {funder.index}")
+        log(f"    ✓ {len(self.wallets)} wallet didanai ({self.args.funding_blocks} block per wallet)")
+
+    # --- Load ------------------------------------------------------------
+
+    def tx_worker(self):
+        interval = 1.0 / self.args.tx_rate
+        next_at = time()
+        while not self.stop_event.is_set():
+            sender, recipient = self.tx_rng.sample(self.wallets, 2)
+            node = self.tx_rng.choice(self.nodes)
+            amount = round(self.tx_rng.uniform(0.001, self.args.max_amount), 3)
+            fee = self.args.fee
+            nonce = sender.next_nonce()
+            tx = {
+                'sender': sender.address,
+                'recipient': recipient.address,
+                'amount': amount,
+                'fee': fee,
+                'nonce': nonce,
+                'signature': sender.sign(recipient.address, amount, fee, nonce)
+            }
+            try:
+                res = node.session.post(f"{node.url}/transactions/new", json=tx, timeout=self.args.request_timeout)
+                accepted = res.status_code == 201
+                error = None if accepted else res.json().get('error', str(res.status_code))
+            except requests.RequestException as e:
+                accepted, error = False, type(e).__name__
+            with self.lock:
+                self.tx_submitted += 1
+                if accepted:
+                    self.tx_accepted += 1
+                else:
+                    self.tx_rejected += 1
+                    key = error.split(' ')[0]  # Kelompokkan per jenis error (Saldo, Nonce, ...)
+                    self.tx_errors[key] = self.tx_errors.get(key, 0) + 1
+
+            next_at += interval
+            self.stop_event.wait(max(0, next_at - time()))
+
+    def record_mined(self, block):
+        """
+        Catat block hasil mine_worker (dikenali dari penanda coinbase).
+        Waktu mined = timestamp block; semua node jalan di host yang sama.
+        Dipanggil dengan self.lock dipegang.
+        """
+        coinbase = next((tx for tx in block['transactions'] if tx['sender'] == "0"), None)
+        if not coinbase or not str(coinbase['recipient']).startswith(MINER_PREFIX):
+            return
+        block_hash = hash_block(block)
+        if block_hash in self.mined:
+            return
+        node_index = int(coinbase['recipient'][len(MINER_PREFIX):].split('-')[0])
+        self.mined[block_hash] = {'index': block['index'], 'node': node_index, 'time': block['timestamp']}
+        self.first_seen.setdefault((block_hash, node_index), block['timestamp'])
+
+    def mine_worker(self):
+        while not self.stop_event.wait(self.args.mine_interval):
+            node = self.mine_rng.choice(self.nodes)
+            self.mine_seq += 1
+            miner_address = f"{MINER_PREFIX}{node.index}-{self.mine_seq}"
+            try:
+                res = node.session.get(f"{node.url}/mine", params={'miner_address': miner_address},
+                                       timeout=self.args.request_timeout)
+                block = res.json()['block']
+            except requests.Timeout:
+                # Node tetap menambang block-nya; block akan tercatat lewat observe()
+                with self.lock:
+                    self.mine_timeouts += 1
+                continue
+            except (requests.RequestException, ValueError, KeyError):
+                with self.lock:
+                    self.mine_failures += 1
+                continue
+            with self.lock:
+                self.record_mined(block)
+
+    def observe(self, node):
+        """Sync satu node ke peers, catat sync time, chain yang terlihat, dan mempool."""
+        started = time()
+        try:
+            res = node.session.get(f"{node.url}/nodes/sync", timeout=self.args.request_timeout)
+            data = res.json()
+            pending = node.session.get(f"{node.url}/transactions/pending", timeout=self.args.request_timeout).json()
+        except (requests.RequestException, ValueError):
+            return
+        now = time()
+        with self.lock:
+            self.sync_times.append(now - started)
+            if data.get('message') == 'Blockchain diperbarui':
+                self.sync_updates += 1
+            self.mempool_samples[node.index].append(len(pending))
+            for block in data['chain']:
+                self.record_mined(block)
+                block_hash = hash_block(block)
+                self.first_seen.setdefault((block_hash, node.index), now)
+                self.height_hashes.setdefault(block['index'], set()).add(block_hash)
+
+    def observer_worker(self):
+        while not self.stop_event.wait(self.args.sync_interval):
+            for node in self.nodes:
+                self.observe(node)
+
+    def run_load(self):
+        log(f"[+] Beban {self.args.duration}s: {self.args.tx_rate} tx/s, mining tiap {self.args.mine_interval}s, sync tiap {self.args.sync_interval}s")
+        threads = [threading.Thread(target=self.mine_worker), threading.Thread(target=self.observer_worker)]
+        if self.args.tx_rate > 0 and len(self.wallets) >= 2:
+            threads.append(threading.Thread(target=self.tx_worker))
+        self.load_started = time()
+        for t in threads:
+            t.start()
+        sleep(self.args.duration)
+        self.stop_event.set()
+        self.load_ended = time()
+        # Request yang masih jalan (mis. /mine) ditunggu, tapi tidak dihitung ke elapsed
+        for t in threads:
+            t.join()
+        elapsed = self.load_ended - self.load_started
+
+        # Beri waktu cluster untuk konvergen sebelum ambil snapshot akhir
+        for _ in range(self.args.settle_rounds):
+            for node in self.nodes:
+                self.observe(node)
+        return elapsed
+
+    # --- Report ----------------------------------------------------------
+
+    def final_chains(self):
+        chains = {}
+        for node in self.nodes:
+            try:
+                chains[node.index] = node.session.get(f"{node.url}/blockchain", timeout=self.args.request_timeout).json()['chain']
+            except (requests.RequestException, ValueError, KeyError):
+                chains[node.index] = []
+        return chains
+
+    def build_report(self, elapsed):
+        chains = self.final_chains()
+        heads = {i: hash_block(chain[-1]) if chain else None for i, chain in chains.items()}
+        canonical = max(chains.values(), key=len)
+        canonical_hashes = {hash_block(block) for block in canonical}
+        confirmed_tx = sum(
+            1 for block in canonical for tx in block['transactions']
+            if tx['sender'] != "0" and tx.get('timestamp', 0) >= self.load_started
+        )
+
+        propagation = []
+        for block_hash, info in self.mined.items():
+            for node in self.nodes:
+                if node.index == info['node']:
+                    continue
+                seen = self.first_seen.get((block_hash, node.index))
+                if seen is not None:
+                    propagation.append(seen - info['time'])
+
+        fork_heights = [h for h, hashes in self.height_hashes.items() if len(hashes) > 1]
+        orphaned = [h for h in self.mined if h not in canonical_hashes]
+
+        mined_in_window = sum(1 for info in self.mined.values() if info['time'] <= self.load_ended)
+        converged = len(set(heads.values())) == 1
+        failures = []
+        if not converged:
+            failures.append("cluster tidak konvergen: head chain berbeda antar node setelah settle")
+        if any(not chain for chain in chains.values()):
+            failures.append("gagal mengambil chain akhir dari sebagian node")
+
+        mempool = {}
+        for index, samples in self.mempool_samples.items():
+            mempool[str(index)] = {
+                'mean': round(mean(samples), 2) if samples else None,
+                'max': max(samples) if samples else None,
+                'final': samples[-1] if samples else None
+            }
+
+        return {
+            'status': 'failed' if failures else 'ok',
+            'failures': failures,
+            'config': {
+                'nodes': len(self.nodes),
+                'wallets': len(self.wallets),
+                'duration': self.args.duration,
+                'tx_rate': self.args.tx_rate,
+                'mine_interval': self.args.mine_interval,
+                'sync_interval': self.args.sync_interval,
+                'key_size': self.args.key_size,
+                'seed': self.args.seed
+            },
+            'elapsed': round(elapsed, 3),
+            'throughput': {
+                'tx_submitted': self.tx_submitted,
+                'tx_accepted': self.tx_accepted,
+                'tx_rejected': self.tx_rejected,
+                'tx_rejected_reasons': self.tx_errors,
+                'tx_confirmed': confirmed_tx,
+                'accepted_tps': round(self.tx_accepted / elapsed, 3),
+                'confirmed_tps': round(confirmed_tx / elapsed, 3),
+                'blocks_mined': len(self.mined),
+                'blocks_mined_after_window': len(self.mined) - mined_in_window,
+                'mine_failures': self.mine_failures,
+                'mine_timeouts': self.mine_timeouts,
+                'blocks_per_sec': round(mined_in_window / elapsed, 3)
+            },
+            'mempool_depth': mempool,
+            # Node tidak push block ke peer; block hanya menyebar saat observer memanggil
+            # /nodes/sync, jadi latency ini didominasi sync_interval, bukan latency jaringan
+            'propagation_latency': dict(summarize(propagation), source='poll',
+                                        poll_interval=self.args.sync_interval),
+            'sync_time': dict(summarize(self.sync_times), updates=self.sync_updates),
+            'forks': {
+                'heights_observed': len(self.height_hashes),
+                'fork_heights': len(fork_heights),
+                'fork_rate': round(len(fork_heights) / len(self.height_hashes), 4) if self.height_hashes else 0,
+                'orphaned_blocks': len(orphaned),
+                'stale_rate': round(len(orphaned) / len(self.mined), 4) if self.mined else 0
+            },
+            'final': {
+                'chain_length': {str(i): len(chain) for i, chain in chains.items()},
+                'converged': converged
+            }
+        }
+
+    def run(self):
+        try:
+            self.start_cluster()
+            if self.args.wallets:
+                self.fund_wallets()
+            # Snapshot awal supaya block hasil funding tidak dihitung sebagai fork
+            for node in self.nodes:
+                self.observe(node)
+            self.sync_times.clear()
+            self.sync_updates = 0
+            elapsed = self.run_load()
+            return self.build_report(elapsed)
+        finally:
+            for node in self.nodes:
+                node.stop()
+            if not self.args.keep_data and not self.args.data_root:
+                shutil.rmtree(self.data_root, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulator cluster DSS_Chain lokal dan load generator")
+    parser.add_argument("--nodes", type=int, default=3, help="Jumlah node")
+    parser.add_argument("--base-port", type=int, default=5100, help="Port node pertama (node ke-i di base-port + i)")
+    parser.add_argument("--data-root", help="Direktori data node (default: temp dir, dihapus setelah selesai)")
+    parser.add_argument("--keep-data", action="store_true", help="Jangan hapus temp data dir")
+    parser.add_argument("--wallets", type=int, default=4, help="Jumlah wallet pengirim transaksi")
+    parser.add_argument("--funding-blocks", type=int, default=2, help="Block reward untuk mendanai tiap wallet")
+    parser.add_argument("--key-size", type=int, default=1024, help="Ukuran RSA key wallet")
+    parser.add_argument("--duration", type=float, default=30, help="Lama beban (detik)")
+    parser.add_argument("--tx-rate", type=float, default=2, help="Transaksi per detik")
+    parser.add_argument("--max-amount", type=float, default=0.05, help="Amount maksimum per transaksi")
+    parser.add_argument("--fee", type=float, default=0.001, help="Fee per transaksi")
+    parser.add_argument("--mine-interval", type=float, default=5, help="Jeda antar mining (detik)")
+    parser.add_argument("--sync-interval", type=float, default=1, help="Jeda antar sync/observasi (detik)")
+    parser.add_argument("--settle-rounds", type=int, default=2, help="Ronde sync setelah beban berhenti")
+    parser.add_argument("--startup-timeout", type=float, default=30, help="Batas waktu node siap (detik)")
+    parser.add_argument("--request-timeout", type=float, default=60, help="Timeout HTTP request (detik)")
+    parser.add_argument("--seed", type=int, help="Seed random untuk beban yang reproducible")
+    parser.add_argument("--report", help="Tulis report JSON ke file ini (default: stdout)")
+    args = parser.parse_args()
+
+    try:
+        report = ClusterSimulator(args).run()
+    except (RuntimeError, requests.RequestException) as e:
+        log(f"[!] Run gagal: {e}")
+        sys.exit(1)
+    output = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(output)
+        log(f"[✔] Report ditulis ke {args.report}")
+    else:
+        print(output)
+    if report['status'] != 'ok':
+        log(f"[!] Run gagal: {'; '.join(report['failures'])}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,349 @@
-import rsa
+"""
+Bulk offline signer untuk transaksi DinarChain.
+
+Membaca transaksi dari CSV/JSONL (kolom: sender, recipient, amount, fee, nonce opsional),
+memberi nonce berurutan per sender, menandatangani secara paralel di semua core,
+lalu menulis hasilnya ke file JSONL atau mengirim ke node secara batch.
+
+Contoh:
+    python signer.py --key private.pem --input txs.csv --output signed.jsonl
+    python signer.py --key alice.pem --key bob.pem --start-nonce alice.pem=12 --input txs.jsonl --node http://127.0.0.1:5000
+    python signer.py --key private.pem --recipient <pubkey> --amount 5
+"""
+import argparse
 import base64
+import csv
 import json
-import argparse
+import os
+import queue
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from time import time
 import requests
+import rsa
+
+DEFAULT_NODE = "http://127.0.0.1:5000"
+
+_PRIVATE_KEYS = {}  # sender (public key PEM) -> rsa.PrivateKey, diisi per worker process
+
+def load_keys(paths):
+    """
+    Muat private key dari file PEM.
+    Return dict alias -> public key PEM (alias: path file dan PEM tanpa
+    whitespace di ujung), dan dict public key PEM -> private key PKCS#1 bytes.
+    """
+    aliases = {}
+    private_keys = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            content = f.read()
+        privkey = rsa.PrivateKey.load_pkcs1(content)
+        pub_pem = rsa.PublicKey(privkey.n, privkey.e).save_pkcs1().decode('utf-8')
+        aliases[path] = pub_pem
+        aliases[os.path.basename(path)] = pub_pem
+        aliases[pub_pem.strip()] = pub_pem
+        private_keys[pub_pem] = content
+    return aliases, private_keys
+
+def short_address(pem):
+    """Potongan public key yang cukup untuk membedakan sender di output."""
+    body = "".join(line for line in pem.strip().splitlines() if not line.startswith("-----"))
+    return body[-16:]
+
+def parse_number(value):
+    """Angka dari CSV/JSONL; int jika bulat, selain itu float."""
+    if isinstance(value, (int, float)):
+        return value
+    value = value.strip()
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+def parse_start_nonces(values, aliases):
+    """
+    Parse --start-nonce: "N" berlaku untuk semua sender, "SENDER=N" untuk satu sender
+    (SENDER = path key atau public key). Return dict sender -> nonce; key None = default.
+    """
+    start_nonces = {None: 0}
+    for value in values:
+        sender_ref, sep, nonce = value.rpartition("=")
+        if not sep:
+            start_nonces[None] = int(nonce)
+            continue
+        sender = aliases.get(sender_ref.strip())
+        if sender is None:
+            raise ValueError(f"--start-nonce: tidak ada private key untuk sender '{sender_ref[:40]}'")
+        start_nonces[sender] = int(nonce)
+    return start_nonces
+
+def read_transactions(path, fmt=None):
+    """Baca baris transaksi dari file CSV atau JSONL."""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, "r", newline="") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                yield row
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+def assign_nonces(rows, aliases, start_nonces):
+    """
+    Resolve sender ke public key dan beri nonce berurutan per sender
+    (urutan sesuai urutan di file input). Kolom nonce yang terisi dipakai apa adanya
+    dan menjadi titik lanjut counter sender tersebut.
+    """
+    default_sender = next(iter(set(aliases.values()))) if len(set(aliases.values())) == 1 else None
+    next_nonce = {}
+    for line_no, row in enumerate(rows, start=1):
+        sender_ref = (row.get('sender') or "").strip()
+        sender = aliases.get(sender_ref) if sender_ref else default_sender
+        if sender is None:
+            raise ValueError(f"Baris {line_no}: tidak ada private key untuk sender '{sender_ref[:40]}'")
+        if not row.get('recipient') or row.get('amount') in (None, ""):
+            raise ValueError(f"Baris {line_no}: recipient dan amount wajib diisi")
+        if row.get('nonce') not in (None, ""):
+            nonce = int(row['nonce'])
+        else:
+            nonce = next_nonce.get(sender, start_nonces.get(sender, start_nonces[None]))
+        next_nonce[sender] = nonce + 1
+        fee = row.get('fee')
+        yield (
+            sender,
+            row['recipient'],
+            parse_number(row['amount']),
+            parse_number(fee) if fee not in (None, "") else 0,
+            nonce
+        )
+
+def _init_worker(private_keys):
+    for sender, content in private_keys.items():
+        _PRIVATE_KEYS[sender] = rsa.PrivateKey.load_pkcs1(content)
+
+def _sign_chunk(chunk):
+    """Return (transaksi yang sudah ditandatangani, detik yang dipakai worker)."""
+    started = time()
+    signed = []
+    for sender, recipient, amount, fee, nonce in chunk:
+        # Harus sama dengan format yang diverifikasi Blockchain.add_transaction
+        message = f"{sender}:{recipient}:{amount}:{fee}:{nonce}"
+        signature = rsa.sign(message.encode(), _PRIVATE_KEYS[sender], "SHA-256")
+        signed.append({
+            "sender": sender,
+            "recipient": recipient,
+            "amount": amount,
+            "fee": fee,
+            "nonce": nonce,
+            "signature": base64.b64encode(signature).decode()
+        })
+    return signed, time() - started
+
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def sign_stream(transactions, private_keys, workers=None, chunk_size=64):
+    """
+    Tanda tangani transaksi secara paralel.
+    Yield (list transaksi yang sudah ditandatangani, detik worker) per chunk, sesuai urutan input.
+    Hanya 2 x workers chunk yang di-submit sekaligus, jadi input dibaca bertahap.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(private_keys,)) as executor:
+        for chunk in chunked(transactions, chunk_size):
+            window.append(executor.submit(_sign_chunk, chunk))
+            if len(window) >= 2 * workers:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+class BatchSubmitter:
+    """
+    Kirim transaksi ke node lewat satu pooled HTTP session, per batch.
+    Pengiriman jalan di thread sendiri supaya signing tidak menunggu HTTP.
+    """
+
+    def __init__(self, node, batch_size=100, timeout=60, max_queue=64):
+        self.url = f"{node.rstrip('/')}/transactions/batch"
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.error = None
+        self.sent = 0
+        self.accepted = 0
+        self.rejected = []
+        self.elapsed = 0.0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def add(self, transactions):
+        if self.error:
+            raise self.error
+        self.queue.put(transactions)
+
+    def finish(self, flush=True):
+        """Tunggu thread pengirim selesai; flush=False membuang sisa yang belum terkirim."""
+        self.queue.put((flush,))
+        self.thread.join()
+        self.session.close()
+        if self.error:
+            raise self.error
+
+    def _run(self):
+        pending = []
+        while True:
+            item = self.queue.get()
+            if isinstance(item, tuple):
+                flush, = item
+                break
+            if self.error:
+                continue  # Tetap kosongkan queue supaya add() tidak macet
+            pending.extend(item)
+            try:
+                while len(pending) >= self.batch_size:
+                    batch, pending = pending[:self.batch_size], pending[self.batch_size:]
+                    self._post(batch)
+            except (RuntimeError, requests.RequestException) as e:
+                self.error = e
+        if flush and pending and not self.error:
+            try:
+                self._post(pending)
+            except (RuntimeError, requests.RequestException) as e:
+                self.error = e
+
+    def _post(self, batch):
+        started = time()
+        res = self.session.post(self.url, json={"transactions": batch}, timeout=self.timeout)
+        self.elapsed += time() - started
+        if res.status_code != 201:
+            raise RuntimeError(f"Node menolak batch: {res.status_code} {res.text}")
+        result = res.json()
+        for item in result.get('rejected', []):
+            tx = batch[item['index']]
+            self.rejected.append({'sender': tx['sender'], 'nonce': tx['nonce'], 'error': item['error']})
+        self.accepted += result.get('accepted', 0)
+        self.sent += len(batch)
+
+def rate(count, seconds):
+    return count / seconds if seconds > 0 else float("inf")
+
+def send_single(transaction, private_keys, node, output):
+    """Mode satu transaksi: tanda tangani langsung (tanpa worker) dan kirim ke /transactions/new."""
+    _init_worker(private_keys)
+    (tx_payload,), _ = _sign_chunk([transaction])
+    if output:
+        with open(output, "w") as f:
+            f.write(json.dumps(tx_payload) + "\n")
+        print(f"Output    : {output}")
+    if not node:
+        return
+    res = requests.post(f"{node.rstrip('/')}/transactions/new", json=tx_payload)
+    print("Transaksi dikirim ke node:")
+    print(f" {node}/transactions/new")
+    print("Payload:")
+    print(json.dumps(tx_payload, indent=2))
+    print("Response:")
+    print(res.status_code, res.json())
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk sign dan kirim transaksi DinarChain")
+    parser.add_argument("--key", action="append", default=[], help="File private key PEM (boleh berulang untuk banyak sender)")
+    parser.add_argument("--input", help="File transaksi CSV atau JSONL (kolom: sender, recipient, amount, fee, nonce)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Format input (default: dari ekstensi file)")
+    parser.add_argument("--sender", help="Sender untuk mode satu transaksi (path key atau public key)")
+    parser.add_argument("--recipient", help="Alamat penerima (mode satu transaksi)")
+    parser.add_argument("--amount", help="Jumlah DNR (mode satu transaksi)")
+    parser.add_argument("--fee", default="0", help="Fee (mode satu transaksi)")
+    parser.add_argument("--start-nonce", action="append", default=[],
+                        help="Nonce pertama: N untuk semua sender, atau SENDER=N per sender (boleh berulang)")
+    parser.add_argument("--output", help="Tulis transaksi yang sudah ditandatangani ke file JSONL")
+    parser.add_argument("--node", help=f"Alamat node target (mode satu transaksi default: {DEFAULT_NODE})")
+    parser.add_argument("--batch-size", type=int, default=100, help="Jumlah transaksi per request ke node")
+    parser.add_argument("--workers", type=int, help="Jumlah worker process (default: jumlah core)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Jumlah transaksi per task signing")
+    args = parser.parse_args()
+
+    if not args.key:
+        args.key = ["private.pem"]
+    if not args.input and not args.recipient:
+        parser.error("butuh --input atau --recipient/--amount")
+    if args.recipient and args.amount is None:
+        parser.error("--amount wajib untuk mode satu transaksi")
+    if args.input and not args.output and not args.node:
+        parser.error("butuh --output dan/atau --node")
+
+    try:
+        aliases, private_keys = load_keys(args.key)
+        start_nonces = parse_start_nonces(args.start_nonce, aliases)
+        if not args.input:
+            row = {'sender': args.sender, 'recipient': args.recipient, 'amount': args.amount, 'fee': args.fee}
+            transaction = next(assign_nonces([row], aliases, start_nonces))
+            node = args.node or (None if args.output else DEFAULT_NODE)
+            send_single(transaction, private_keys, node, args.output)
+            return
+    except (ValueError, requests.RequestException) as e:
+        print(f"[!] {e}", file=sys.stderr)
+        sys.exit(1)
+
+    rows = read_transactions(args.input, args.format)
+    transactions = assign_nonces(rows, aliases, start_nonces)
+
+    out = open(args.output, "w") if args.output else None
+    submitter = BatchSubmitter(args.node, args.batch_size) if args.node else None
+    signed_count = 0
+    worker_time = 0.0
+    started = time()
+    sign_done = started
+    try:
+        for signed, seconds in sign_stream(transactions, private_keys, args.workers, args.chunk_size):
+            signed_count += len(signed)
+            worker_time += seconds
+            if out:
+                for tx in signed:
+                    out.write(json.dumps(tx) + "\n")
+            if submitter:
+                submitter.add(signed)
+        # Signing selesai saat chunk terakhir diterima dari worker
+        sign_done = time()
+        if submitter:
+            submitter.finish()
+    except (ValueError, RuntimeError, requests.RequestException) as e:
+        if submitter and submitter.thread.is_alive():
+            try:
+                submitter.finish(flush=False)
+            except (RuntimeError, requests.RequestException):
+                pass
+        print(f"[!] {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if out:
+            out.close()
+    total = time() - started
+
+    sign_time = sign_done - started
+    print(f"Signed    : {signed_count} transaksi dalam {sign_time:.2f}s ({rate(signed_count, sign_time):.1f} tx/s), "
+          f"waktu worker {worker_time:.2f}s ({rate(signed_count, worker_time):.1f} tx/s per core)")
+    if out:
+        print(f"Output    : {args.output}")
+    if submitter:
+        print(f"Submitted : {submitter.sent} transaksi ke {submitter.url} dalam {submitter.elapsed:.2f}s ({rate(submitter.sent, submitter.elapsed):.1f} tx/s)")
+        print(f"Accepted  : {submitter.accepted}, Rejected: {len(submitter.rejected)}")
+        for item in submitter.rejected[:10]:
+            print(f"  [!] sender ...{short_address(item['sender'])} nonce {item['nonce']}: {item['error'][:100]}")
+    print(f"Total     : {total:.2f}s ({rate(signed_count, total):.1f} tx/s end-to-end)")
 
-# Load private key
-with open("private.pem", "rb") as f:
-    privkey = rsa.PrivateKey.load_pkcs1(f.read())
-
-# Argparse for CLI
-parser = argparse.ArgumentParser(description="Sign and send DinarChain transaction")
-parser.add_argument("--sender", required=True, help="Alamat pengirim")
-parser.add_argument("--recipient", required=True, help="Alamat penerima")
-parser.add_argument("--amount", type=int, required=True, help="Jumlah DNR")
-parser.add_argument("--node", default="http://127.0.0.1:5000", help="Alamat node target")
-args = parser.parse_args()
-
-# Prepare data to sign
-message = f"{args.sender}:{args.recipient}:{args.amount}"
-signature = rsa.sign(message.encode(), privkey, "SHA-256")
-signature_b64 = base64.b64encode(signature).decode()
-
-# Prepare payload
-tx_payload = {
-    "sender": args.sender,
-    "recipient": args.recipient,
-    "amount": args.amount,
-    "signature": signature_b64
-}
-
-# Send to blockchain node
-res = requests.post(f"{args.node}/transactions/new", json=tx_payload)
-
-# Output result
-print("Transaksi dikirim ke node:")
-print(f" {args.node}/transactions/new")
-print("Payload:")
-print(json.dumps(tx_payload, indent=2))
-print("Response:")
-print(res.status_code, res.json())
\ No newline at end of file
+if __name__ == "__main__":
+    main()
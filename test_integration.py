@@ -91,7 +91,37 @@ def main():
     except Exception as e:
         print(f"    Error: {e}\n")
 
-    print("[7] Mining more blocks to test Dynamic Difficulty...")
+    print("[7] Testing Batch Transactions (mixed valid/invalid)...")
+    batch_amount = 0.1
+    batch_fee = 0
+    batch_nonce = 1
+    message = f"{pk_a}:{pk_b}:{batch_amount}:{batch_fee}:{batch_nonce}"
+    batch_signature = base64.b64encode(rsa.sign(message.encode(), sk_a, 'SHA-256')).decode()
+    valid_tx = {
+        "sender": pk_a,
+        "recipient": pk_b,
+        "amount": batch_amount,
+        "fee": batch_fee,
+        "nonce": batch_nonce,
+        "signature": batch_signature
+    }
+    batch = [
+        valid_tx,                                   # 0: valid
+        {"sender": pk_a, "recipient": pk_b},        # 1: field kurang
+        1,                                          # 2: bukan object
+        dict(valid_tx, amount="x"),                 # 3: tipe amount salah
+        dict(valid_tx, nonce=batch_nonce + 1),      # 4: signature tidak cocok
+    ]
+    res = requests.post(f"{BASE_URL}/transactions/batch", json={"transactions": batch})
+    result = res.json()
+    rejected_indices = sorted(item['index'] for item in result.get('rejected', []))
+    batch_ok = res.status_code == 201 and result.get('accepted') == 1 and rejected_indices == [1, 2, 3, 4]
+    if batch_ok:
+        print(f"    ✓ Batch OK: accepted {result['accepted']}, rejected index {rejected_indices}\n")
+    else:
+        print(f"    ✗ Batch tidak sesuai: {res.status_code} {result}\n")
+
+    print("[8] Mining more blocks to test Dynamic Difficulty...")
     for i in range(5):
         requests.get(f"{BASE_URL}/mine", params={'miner_address': pk_a})
         sleep(0.2)  # Fast mining
@@ -100,14 +130,14 @@ def main():
     # Get chain info
     chain_res = requests.get(f"{BASE_URL}/blockchain").json()
     latest_block = chain_res['chain'][-1]
-    print(f"[8] Latest Block Info:")
+    print(f"[9] Latest Block Info:")
     print(f"    Index: {latest_block['index']}")
     print(f"    Difficulty: {latest_block.get('difficulty', 'N/A')}")
     print(f"    Merkle Root: {latest_block.get('merkle_root', 'N/A')[:16]}...")
     print(f"    Transactions: {len(latest_block['transactions'])}\n")
 
     print("=== Test Complete ===")
-    if bal_b == 1.5 and bal_miner == 1.25:
+    if bal_b == 1.5 and bal_miner == 1.25 and batch_ok:
         print("✓ All features working correctly!")
     else:
         print("⚠ Some features may need verification")
@@ -1,9 +1,9 @@
 import rsa
 import base64
 
-def generate_keypair():
+def generate_keypair(key_size=1024):
     """Menghasilkan pasangan kunci privat dan publik baru."""
-    public_key, private_key = rsa.newkeys(1024)
+    public_key, private_key = rsa.newkeys(key_size)
     pub_pem = public_key.save_pkcs1().decode('utf-8')
     priv_pem = private_key.save_pkcs1().decode('utf-8')
     return pub_pem, priv_pem
@@ -0,0 +1,166 @@
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from functools import partial
+from time import time
+from utils_crypto import generate_keypair
+
+REFILL_RATE_WINDOW = 60  # Hitung refill rate dari 60 detik terakhir
+
+class KeypairPool:
+    """
+    Pool keypair RSA yang sudah di-generate di background.
+    Generate prime (rsa.newkeys) lambat dan variatif, jadi dikerjakan oleh
+    worker process supaya request /wallet/new tidak memblok node.
+    """
+
+    def __init__(self, size=8, key_size=1024, workers=None):
+        self.size = size
+        self.key_size = key_size
+        self.workers = workers
+        self._keys = deque()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._in_flight = 0
+        self._refill_times = deque()
+        self._started_at = None
+        self.generated = 0
+        self.served = 0
+        self.misses = 0
+
+    def start(self):
+        """Jalankan worker process dan isi pool sampai penuh."""
+        self._ensure_started()
+        self._refill()
+
+    def _ensure_started(self):
+        # Dipanggil juga dari get(), supaya pool tetap jalan walau app
+        # dijalankan lewat `flask run` / WSGI server (tanpa blok __main__).
+        # Pakai "spawn": fork dari server Flask yang multithreaded tidak aman.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                if self._started_at is None:
+                    self._started_at = time()
+            return self._executor
+
+    def _reset_executor(self, executor):
+        """Buang executor yang broken; get() berikutnya membuat yang baru."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self._in_flight = 0
+        print("[!] Worker keygen broken, executor dibuat ulang")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._in_flight = 0
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _refill(self):
+        with self._lock:
+            executor = self._executor
+            needed = self.size - len(self._keys) - self._in_flight
+            if executor is None or needed <= 0:
+                return
+            self._in_flight += needed
+        for i in range(needed):
+            try:
+                future = executor.submit(generate_keypair, self.key_size)
+            except RuntimeError as e:
+                # Executor sudah shutdown / broken (BrokenExecutor turunan RuntimeError)
+                print(f"[!] Gagal submit keygen ke worker: {e}")
+                with self._lock:
+                    if self._executor is executor:
+                        self._in_flight -= needed - i
+                self._reset_executor(executor)
+                return
+            future.add_done_callback(partial(self._on_generated, executor))
+
+    def _on_generated(self, executor, future):
+        try:
+            keypair = future.result()
+        except BrokenExecutor as e:
+            print(f"[!] Gagal generate keypair di worker: {e}")
+            self._reset_executor(executor)
+            return
+        except Exception as e:
+            print(f"[!] Gagal generate keypair di worker: {e}")
+            keypair = None
+        with self._lock:
+            # Future dari executor lama (sudah di-reset) tidak dihitung lagi
+            if self._executor is executor:
+                self._in_flight -= 1
+            if keypair is None:
+                return
+            now = time()
+            self._keys.append(keypair)
+            self.generated += 1
+            self._refill_times.append(now)
+            self._trim_refill_times(now)
+
+    def _trim_refill_times(self, now):
+        while self._refill_times and self._refill_times[0] < now - REFILL_RATE_WINDOW:
+            self._refill_times.popleft()
+
+    def get(self):
+        """
+        Ambil satu keypair (pub_pem, priv_pem) dari pool dalam O(1).
+        Jika pool kosong, tunggu satu keypair dari worker process
+        (future.result() melepas GIL, jadi endpoint lain tidak ikut macet).
+        Jika worker broken, executor dibuat ulang dan keypair di-generate
+        langsung sebagai jalan terakhir.
+        """
+        executor = self._ensure_started()
+        with self._lock:
+            if self._keys:
+                keypair = self._keys.popleft()
+                self.served += 1
+            else:
+                keypair = None
+                self.misses += 1
+        future = None
+        if keypair is None:
+            # Submit dulu sebelum refill supaya tidak antri di belakangnya
+            try:
+                future = executor.submit(generate_keypair, self.key_size)
+            except RuntimeError as e:
+                print(f"[!] Gagal submit keygen ke worker: {e}")
+                self._reset_executor(executor)
+        self._refill()
+        if future is not None:
+            try:
+                keypair = future.result()
+            except RuntimeError as e:
+                print(f"[!] Worker keygen gagal: {e}")
+                self._reset_executor(executor)
+        if keypair is None:
+            keypair = generate_keypair(self.key_size)
+        return keypair
+
+    def stats(self):
+        """Metrics pool: depth, jumlah in-flight, dan refill rate (keys/detik)."""
+        with self._lock:
+            now = time()
+            self._trim_refill_times(now)
+            started_at = self._started_at if self._started_at is not None else now
+            window = min(REFILL_RATE_WINDOW, max(now - started_at, 1e-9))
+            return {
+                'depth': len(self._keys),
+                'size': self.size,
+                'key_size': self.key_size,
+                'running': self._executor is not None,
+                'in_flight': self._in_flight,
+                'generated': self.generated,
+                'served': self.served,
+                'misses': self.misses,
+                'refill_rate': round(len(self._refill_times) / window, 3)
+            }